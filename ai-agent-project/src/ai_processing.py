@@ -2,57 +2,304 @@
 # AI_PROCESSING.PY - Enhanced AI Processing Module
 # =============================================================================
 
-import openai
+import asyncio
 import os
+import re
+import threading
 import time
-import json
-from typing import Optional, List, Dict, Any
+import orjson
+from typing import Optional, List, Dict, Any, Iterator, AsyncIterator
+
+from openai import AsyncOpenAI, DefaultAioHttpClient
+
+from llm_batcher import BatchingLLMClient
+from llm_cache import LLMCache, MemoryLRUBackend, RedisBackend
+
+# Offline fallback content, matched with precompiled single-pass patterns
+_FALLBACK_EXPLANATIONS = {
+    "binary search": "Binary Search is an efficient algorithm for finding a target value in a sorted array. It works by repeatedly dividing the search interval in half. Time complexity: O(log n), Space complexity: O(1) for iterative version.",
+    
+    "recursion": "Recursion is a programming technique where a function calls itself to solve smaller instances of the same problem. Key components: base case (stopping condition) and recursive case (function calls itself). Common examples: factorial, fibonacci, tree traversal.",
+    
+    "dynamic programming": "Dynamic Programming solves complex problems by breaking them into simpler subproblems and storing solutions to avoid redundant calculations. Two approaches: top-down (memoization) and bottom-up (tabulation). Examples: knapsack, longest common subsequence.",
+    
+    "linked list": "A linear data structure where elements (nodes) are stored in sequence, each containing data and a reference to the next node. Types: singly, doubly, circular. Operations: insertion, deletion, traversal. Time complexity varies by operation and position.",
+    
+    "sorting algorithms": "Algorithms that arrange elements in a specific order. Common types: Bubble Sort O(n²), Quick Sort O(n log n) average, Merge Sort O(n log n), Heap Sort O(n log n). Each has different trade-offs for time, space, and stability."
+}
+
+_FALLBACK_EXPLANATION_PATTERN = re.compile(
+    "(" + "|".join(re.escape(key) for key in _FALLBACK_EXPLANATIONS) + ")",
+    re.IGNORECASE
+)
+
+_FALLBACK_CHAT_REPLIES = (
+    (("hello", "hi", "hey"), "Hello! I'm your programming assistant. I can help explain concepts, analyze code, and answer programming questions. (Note: Advanced AI features require OpenAI API configuration)"),
+    
+    (("help", "what can you do"), """I can help you with:
+            • Code execution in multiple languages
+            • Programming concept explanations  
+            • Code analysis and optimization
+            • Algorithm and data structure guidance
+            • Debugging assistance
+            
+            Try commands like 'explain binary search' or 'analyze my code'!"""),
+    
+    (("time complexity",), "Time complexity measures how algorithm runtime grows with input size. Common complexities: O(1) constant, O(log n) logarithmic, O(n) linear, O(n²) quadratic, O(2ⁿ) exponential.")
+)
+
+_FALLBACK_CHAT_PRIORITY = {
+    keyword: priority
+    for priority, (keywords, _) in enumerate(_FALLBACK_CHAT_REPLIES)
+    for keyword in keywords
+}
+
+_FALLBACK_CHAT_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in _FALLBACK_CHAT_PRIORITY) + r")\b",
+    re.IGNORECASE
+)
 
 class AIProcessor:
     """Enhanced AI processing with multiple capabilities."""
     
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.client = None
+        self.batcher = None
+        self._loop = None
+        # Fire-and-forget work on the loop, held until done so it isn't collected
+        self._background = set()
+        
         if self.api_key:
-            openai.api_key = self.api_key
+            # All OpenAI traffic runs on one background event loop so every
+            # Flask worker thread shares a single pooled aiohttp transport.
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=self._loop.run_forever,
+                name="ai-processor-loop",
+                daemon=True
+            ).start()
+            self.client = self._run(self._create_client())
+            self.batcher = BatchingLLMClient(self.client)
+        
+        # Response cache; Redis shares entries across workers when configured
+        redis_url = os.getenv('REDIS_URL')
+        self.cache = LLMCache(RedisBackend(redis_url) if redis_url else MemoryLRUBackend())
         
         # Chat context storage (in production, use Redis/database)
         self.chat_contexts = {}
     
+    async def _create_client(self) -> AsyncOpenAI:
+        """Create the OpenAI client inside the processor's event loop."""
+        return AsyncOpenAI(api_key=self.api_key, http_client=DefaultAioHttpClient())
+    
+    def _run(self, coro):
+        """Run a coroutine on the processor's event loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    async def _complete(self, **kwargs) -> str:
+        """Send a chat completion request through the batcher and return the message content."""
+        return await self.batcher.submit(**kwargs)
+    
+    async def _stream(self, **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive."""
+        stream = await self.client.chat.completions.create(stream=True, **kwargs)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _iterate(self, agen: AsyncIterator[str]) -> Iterator[str]:
+        """Drive an async generator on the processor's event loop from synchronous code."""
+        try:
+            while True:
+                item = self._run(self._anext(agen))
+                if item is None:
+                    return
+                yield item
+        finally:
+            self._run(agen.aclose())
+    
+    @staticmethod
+    async def _anext(agen: AsyncIterator[str]) -> Optional[str]:
+        try:
+            return await agen.__anext__()
+        except StopAsyncIteration:
+            return None
+    
+    async def _embed(self, text: str) -> List[float]:
+        """Embed text for the semantic cache tier."""
+        response = await self.client.embeddings.create(
+            model="text-embedding-3-small",
+            input=text
+        )
+        return response.data[0].embedding
+    
+    async def _index_similar(self, text: str, key: str) -> None:
+        """Embed text and point the semantic tier at key; best effort."""
+        try:
+            self.cache.add_similar(await self._embed(text), key)
+        except Exception:
+            pass
+    
+    def _cached_complete(self, **kwargs) -> str:
+        """Serve a completion from the exact-match cache, calling the API on a miss."""
+        key = self.cache.make_key(kwargs)
+        content = self.cache.get(key)
+        if content is None:
+            content = self._run(self._complete(**kwargs))
+            self.cache.set(key, content, ttl=3600)
+        return content
+    
     def explain_topic(self, topic: str) -> str:
         """Generate detailed explanation of programming topics."""
         try:
             if not self.api_key:
                 return self._fallback_explanation(topic)
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert programming tutor. Provide detailed, practical explanations with examples and use cases."
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Explain {topic} in detail with practical examples, implementation tips, and real-world applications."
-                    }
-                ],
-                max_tokens=1200,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content
+            request = self._explanation_request(topic)
+            key = self.cache.make_key(request)
+            explanation = self.cache.get(key)
+            if explanation is not None:
+                return explanation
+            
+            # Near-duplicate topics ("binary search" vs "binary search algorithm")
+            # share one explanation via the semantic tier
+            embedding = self._run(self._embed(topic))
+            explanation = self.cache.get_similar(embedding)
+            if explanation is not None:
+                # Repeats of this exact topic can now skip the embeddings call
+                self.cache.set(key, explanation, ttl=3600)
+                return explanation
+            
+            explanation = self._run(self._complete(**request))
+            self.cache.set(key, explanation, ttl=3600)
+            self.cache.add_similar(embedding, key)
+            return explanation
             
         except Exception as e:
             return f"Error generating explanation: {str(e)}"
     
+    def stream_explanation(self, topic: str) -> Iterator[str]:
+        """Yield an explanation in chunks as the model generates it."""
+        try:
+            if not self.api_key:
+                yield self._fallback_explanation(topic)
+                return
+            
+            request = self._explanation_request(topic)
+            key = self.cache.make_key(request)
+            explanation = self.cache.get(key)
+            if explanation is not None:
+                yield explanation
+                return
+            
+            # No semantic lookup here: waiting on an embeddings call before the
+            # first token would undo the point of streaming
+            chunks = []
+            for chunk in self._iterate(self._stream(**request)):
+                chunks.append(chunk)
+                yield chunk
+            
+            self.cache.set(key, "".join(chunks), ttl=3600)
+            
+            # Index the answer for non-streamed near-duplicates without holding up [DONE]
+            future = asyncio.run_coroutine_threadsafe(self._index_similar(topic, key), self._loop)
+            self._background.add(future)
+            future.add_done_callback(self._background.discard)
+            
+        except Exception as e:
+            yield f"Error generating explanation: {str(e)}"
+    
     def analyze_code(self, code: str, language: str) -> Dict[str, Any]:
         """Comprehensive code analysis."""
         try:
             if not self.api_key:
                 return self._fallback_analysis(code, language)
             
-            prompt = f"""
+            content = self._cached_complete(**self._analysis_request(code, language))
+            return self._parse_analysis(content)
+                
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def submit_batch(self, jobs: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Queue code analysis jobs on the OpenAI Batch API (24h window, half the cost)."""
+        try:
+            if not self.api_key:
+                return {"error": "Batch analysis requires OpenAI API configuration"}
+            
+            lines = [
+                orjson.dumps({
+                    "custom_id": f"job-{index}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._analysis_request(job["code"], job.get("language", "python"))
+                })
+                for index, job in enumerate(jobs)
+            ]
+            
+            batch = self._run(self._create_batch(b"\n".join(lines)))
+            return {"batch_id": batch.id, "status": batch.status}
+            
+        except Exception as e:
+            return {"error": f"Batch submission failed: {str(e)}"}
+    
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Fetch batch status and, once available, the per-job analyses."""
+        try:
+            if not self.api_key:
+                return {"error": "Batch analysis requires OpenAI API configuration"}
+            
+            batch, output = self._run(self._fetch_batch(batch_id))
+            result = {
+                "batch_id": batch.id,
+                "status": batch.status,
+                "request_counts": batch.request_counts.model_dump() if batch.request_counts else {}
+            }
+            
+            if output is not None:
+                results = {}
+                for line in output.splitlines():
+                    if not line.strip():
+                        continue
+                    item = orjson.loads(line)
+                    response = item.get("response") or {}
+                    if item.get("error") or response.get("status_code") != 200:
+                        results[item["custom_id"]] = {"error": item.get("error") or response.get("body")}
+                    else:
+                        content = response["body"]["choices"][0]["message"]["content"]
+                        results[item["custom_id"]] = self._parse_analysis(content)
+                result["results"] = results
+            
+            return result
+            
+        except Exception as e:
+            return {"error": f"Batch lookup failed: {str(e)}"}
+    
+    async def _create_batch(self, payload: bytes):
+        """Upload a JSONL request file and start a batch over it."""
+        batch_file = await self.client.files.create(
+            file=("analysis_batch.jsonl", payload),
+            purpose="batch"
+        )
+        return await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+    
+    async def _fetch_batch(self, batch_id: str):
+        """Retrieve a batch and the text of its output file, if it has one."""
+        batch = await self.client.batches.retrieve(batch_id)
+        output = None
+        if batch.output_file_id:
+            content = await self.client.files.content(batch.output_file_id)
+            output = content.text
+        return batch, output
+    
+    def _analysis_request(self, code: str, language: str) -> Dict[str, Any]:
+        """Build the chat completion parameters for a code analysis."""
+        prompt = f"""
             Analyze this {language} code comprehensively:
 
             ```{language}
@@ -68,27 +315,26 @@ class AIProcessor:
             - "security": Security considerations (if applicable)
             - "best_practices": Best practices recommendations
             """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert code reviewer. Provide thorough, actionable analysis in valid JSON format."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.3
-            )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return {"analysis": response.choices[0].message.content}
-                
-        except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
+        
+        return dict(
+            model="gpt-4",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are an expert code reviewer. Provide thorough, actionable analysis in valid JSON format."
+                },
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=1000,
+            temperature=0.3
+        )
+    
+    def _parse_analysis(self, content: str) -> Dict[str, Any]:
+        """Decode the model's JSON analysis, keeping raw text if it is not valid JSON."""
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return {"analysis": content}
     
     def chat_response(self, message: str, context: List[Dict] = None) -> str:
         """Generate conversational AI responses."""
@@ -96,48 +342,85 @@ class AIProcessor:
             if not self.api_key:
                 return self._fallback_chat(message)
             
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful programming assistant. Provide clear, practical answers to coding questions."
-                }
-            ]
+            return self._cached_complete(**self._chat_request(message, context))
             
-            # Add context if provided
-            if context:
-                messages.extend(context[-5:])  # Keep last 5 exchanges
+        except Exception as e:
+            return f"Chat error: {str(e)}"
+    
+    def stream_chat_response(self, message: str, context: List[Dict] = None) -> Iterator[str]:
+        """Yield a chat response in chunks as the model generates it."""
+        try:
+            if not self.api_key:
+                yield self._fallback_chat(message)
+                return
             
-            messages.append({"role": "user", "content": message})
+            request = self._chat_request(message, context)
+            key = self.cache.make_key(request)
+            response = self.cache.get(key)
+            if response is not None:
+                yield response
+                return
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=800,
-                temperature=0.8
-            )
+            chunks = []
+            for chunk in self._iterate(self._stream(**request)):
+                chunks.append(chunk)
+                yield chunk
             
-            return response.choices[0].message.content
+            self.cache.set(key, "".join(chunks), ttl=3600)
             
         except Exception as e:
-            return f"Chat error: {str(e)}"
+            yield f"Chat error: {str(e)}"
+    
+    def _explanation_request(self, topic: str) -> Dict[str, Any]:
+        """Build the chat completion parameters for a topic explanation."""
+        return dict(
+            model="gpt-4",
+            messages=[
+                {
+                    "role": "system", 
+                    "content": "You are an expert programming tutor. Provide detailed, practical explanations with examples and use cases."
+                },
+                {
+                    "role": "user", 
+                    "content": f"Explain {topic} in detail with practical examples, implementation tips, and real-world applications."
+                }
+            ],
+            max_tokens=1200,
+            temperature=0.7
+        )
+    
+    def _chat_request(self, message: str, context: List[Dict] = None) -> Dict[str, Any]:
+        """Build the chat completion parameters for a chat turn."""
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a helpful programming assistant. Provide clear, practical answers to coding questions."
+            }
+        ]
+        
+        # Add context if provided
+        if context:
+            messages.extend(context[-5:])  # Keep last 5 exchanges
+        
+        messages.append({"role": "user", "content": message})
+        
+        return dict(
+            model="gpt-4",
+            messages=messages,
+            max_tokens=800,
+            temperature=0.8
+        )
     
     def _fallback_explanation(self, topic: str) -> str:
         """Fallback explanations when AI is unavailable."""
-        explanations = {
-            "binary search": "Binary Search is an efficient algorithm for finding a target value in a sorted array. It works by repeatedly dividing the search interval in half. Time complexity: O(log n), Space complexity: O(1) for iterative version.",
-            
-            "recursion": "Recursion is a programming technique where a function calls itself to solve smaller instances of the same problem. Key components: base case (stopping condition) and recursive case (function calls itself). Common examples: factorial, fibonacci, tree traversal.",
-            
-            "dynamic programming": "Dynamic Programming solves complex problems by breaking them into simpler subproblems and storing solutions to avoid redundant calculations. Two approaches: top-down (memoization) and bottom-up (tabulation). Examples: knapsack, longest common subsequence.",
-            
-            "linked list": "A linear data structure where elements (nodes) are stored in sequence, each containing data and a reference to the next node. Types: singly, doubly, circular. Operations: insertion, deletion, traversal. Time complexity varies by operation and position.",
-            
-            "sorting algorithms": "Algorithms that arrange elements in a specific order. Common types: Bubble Sort O(n²), Quick Sort O(n log n) average, Merge Sort O(n log n), Heap Sort O(n log n). Each has different trade-offs for time, space, and stability."
-        }
+        match = _FALLBACK_EXPLANATION_PATTERN.search(topic)
+        if match:
+            return _FALLBACK_EXPLANATIONS[match.group(1).lower()]
         
+        # Partial topics such as "binary" still resolve to their full entry
         topic_lower = topic.lower()
-        for key, explanation in explanations.items():
-            if key in topic_lower or topic_lower in key:
+        for key, explanation in _FALLBACK_EXPLANATIONS.items():
+            if topic_lower in key:
                 return explanation
         
         return f"Explanation for '{topic}' is not available offline. Please configure OpenAI API for AI-powered explanations."
@@ -164,23 +447,9 @@ class AIProcessor:
     
     def _fallback_chat(self, message: str) -> str:
         """Simple chat responses without AI."""
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ["hello", "hi", "hey"]):
-            return "Hello! I'm your programming assistant. I can help explain concepts, analyze code, and answer programming questions. (Note: Advanced AI features require OpenAI API configuration)"
-        
-        elif any(word in message_lower for word in ["help", "what can you do"]):
-            return """I can help you with:
-            • Code execution in multiple languages
-            • Programming concept explanations  
-            • Code analysis and optimization
-            • Algorithm and data structure guidance
-            • Debugging assistance
-            
-            Try commands like 'explain binary search' or 'analyze my code'!"""
-        
-        elif "time complexity" in message_lower:
-            return "Time complexity measures how algorithm runtime grows with input size. Common complexities: O(1) constant, O(log n) logarithmic, O(n) linear, O(n²) quadratic, O(2ⁿ) exponential."
+        # Earlier entries in _FALLBACK_CHAT_REPLIES take priority when several keywords match
+        matches = [_FALLBACK_CHAT_PRIORITY[keyword.lower()] for keyword in _FALLBACK_CHAT_PATTERN.findall(message)]
+        if matches:
+            return _FALLBACK_CHAT_REPLIES[min(matches)][1]
         
-        else:
-            return f"I understand you're asking about: '{message}'. For detailed AI-powered responses, please configure the OpenAI API key. I can still help with code execution and basic programming guidance!"
\ No newline at end of file
+        return f"I understand you're asking about: '{message}'. For detailed AI-powered responses, please configure the OpenAI API key. I can still help with code execution and basic programming guidance!"
\ No newline at end of file
@@ -6,14 +6,27 @@ import os
 import subprocess
 import sqlite3
 import bcrypt
-import tempfile
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+import xxhash
 import logging
-import json
+import orjson
 import time
+import queue
+import threading
+import atexit
+import hashlib
+import hmac
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import timedelta
-from flask import Flask, request, jsonify
+from types import MappingProxyType
+from cachetools import TTLCache
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_jwt_extended import (
-    JWTManager, create_access_token, jwt_required, get_jwt_identity
+    JWTManager, create_access_token, jwt_required, get_jwt_identity, get_jwt
 )
 from ai_processing import AIProcessor
 
@@ -21,28 +34,127 @@ from ai_processing import AIProcessor
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for faster request/response (de)serialization."""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+class CachingJWTManager(JWTManager):
+    """JWTManager that remembers decoded tokens for a short while.
+    
+    Clients send the same bearer token on every request, so verifying the
+    signature and parsing the claims again each time is wasted work. Decoded
+    claims are cached for 30 s, keyed by a hash of the raw token; the exp claim
+    is still checked on every hit, so a cached token never outlives itself.
+    """
+    
+    def __init__(self, app=None, maxsize=10_000, ttl=30):
+        self._decoded_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._decoded_cache_lock = threading.Lock()
+        super().__init__(app)
+    
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        # CSRF-checked and expiry-tolerant decodes are rare; keep them uncached
+        if csrf_value or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        
+        key = hashlib.sha256(encoded_token.encode()).digest()[:16]
+        with self._decoded_cache_lock:
+            claims = self._decoded_cache.get(key)
+        
+        if claims is not None and claims.get("exp", float("inf")) > time.time():
+            return dict(claims)
+        
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        with self._decoded_cache_lock:
+            self._decoded_cache[key] = claims
+        return dict(claims)
+
 app = Flask(__name__)
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "supersecretkey-change-in-production")
+app.json = ORJSONProvider(app)
+# Read once and kept as bytes so signing and verifying don't re-encode it
+app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "supersecretkey-change-in-production").encode()
 app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
-jwt = JWTManager(app)
+jwt = CachingJWTManager(app)
 
 # Initialize AI processor
 ai_processor = AIProcessor()
 
+# Background workers for Docker runs and AI analysis
+executor = ThreadPoolExecutor(max_workers=16)
+
+# Long-lived SQLite connections shared by request threads, seeded in init_db()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+DB_POOL = queue.Queue(maxsize=DB_POOL_SIZE)
+
+def _new_conn() -> sqlite3.Connection:
+    """Open an autocommit WAL connection with the pragmas every handle uses."""
+    conn = sqlite3.connect("users.db", check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+@contextmanager
+def get_conn():
+    """Borrow a pooled connection for the duration of the block."""
+    try:
+        conn = DB_POOL.get_nowait()
+    except queue.Empty:
+        # More request threads than pooled handles: open one rather than wait
+        conn = _new_conn()
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        try:
+            DB_POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
 def init_db():
     """Create a SQLite database with users and execution_logs tables."""
-    conn = sqlite3.connect("users.db")
-    cursor = conn.cursor()
+    # Fill the connection pool once per worker
+    while not DB_POOL.full():
+        DB_POOL.put_nowait(_new_conn())
+    
+    with get_conn() as conn:
+        _create_tables(conn.cursor())
+        _migrate_schema(conn)
+    
+    logger.info("Database initialized successfully")
+    
+    # Single background writer for execution logs
+    global _log_writer_thread
+    if _log_writer_thread is None:
+        _log_writer_thread = threading.Thread(target=_log_writer, name="log-writer", daemon=True)
+        _log_writer_thread.start()
+        atexit.register(_stop_log_writer)
     
+    # Warm sandbox containers for /execute
+    container_pool.start()
+
+def _create_tables(cursor):
+    """Create the users, execution_logs and batch_jobs tables if missing."""
     # Users table
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
+            username TEXT PRIMARY KEY NOT NULL,
             password BLOB NOT NULL,
             role TEXT DEFAULT 'user',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+        ) WITHOUT ROWID
     """)
     
     # Execution logs table for monitoring
@@ -59,23 +171,121 @@ def init_db():
         )
     """)
     
-    conn.commit()
-    conn.close()
-    logger.info("Database initialized successfully")
+    # Covering index for the /stats aggregation
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_logs_lang_success
+        ON execution_logs (language, success)
+    """)
+    
+    # Batch API jobs submitted through /ai/analyze_batch
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS batch_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT UNIQUE NOT NULL,
+            username TEXT,
+            job_count INTEGER,
+            status TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (username) REFERENCES users (username)
+        )
+    """)
+    
+
+def _migrate_schema(conn):
+    """
+    Bring databases created by older versions up to date, tracked in
+    PRAGMA user_version. Runs under an immediate transaction so concurrently
+    starting workers migrate only once.
+    
+    1: users is clustered on username (WITHOUT ROWID), so a login lookup is a
+       single b-tree descent; the unused surrogate id column is dropped.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if "id" in columns:
+                conn.execute("""
+                    CREATE TABLE users_new (
+                        username TEXT PRIMARY KEY NOT NULL,
+                        password BLOB NOT NULL,
+                        role TEXT DEFAULT 'user',
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    ) WITHOUT ROWID
+                """)
+                conn.execute("""
+                    INSERT INTO users_new (username, password, role, created_at)
+                    SELECT username, password, role, created_at FROM users
+                """)
+                conn.execute("DROP TABLE users")
+                conn.execute("ALTER TABLE users_new RENAME TO users")
+                logger.info("Migrated users table to WITHOUT ROWID")
+            conn.execute("PRAGMA user_version=1")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Execution log rows waiting for the background writer
+LOG_Q = queue.Queue(maxsize=10000)
+_log_writer_thread = None
+_dropped_logs = 0
+_dropped_logs_lock = threading.Lock()
+
+def _log_writer():
+    """Drain LOG_Q, writing up to 256 rows (or 50 ms worth) per transaction."""
+    # The writer keeps its own connection instead of holding one from the pool
+    conn = _new_conn()
+    while True:
+        rows = [LOG_Q.get()]
+        deadline = time.monotonic() + 0.05
+        while len(rows) < 256:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(LOG_Q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        # None is the shutdown sentinel
+        stop = None in rows
+        rows = [row for row in rows if row is not None]
+        
+        if rows:
+            try:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO execution_logs (username, language, code_hash, execution_time, success) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                conn.execute("COMMIT")
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                logger.error(f"Failed to log {len(rows)} executions: {e}")
+        
+        if stop:
+            return
+
+def _stop_log_writer():
+    """Flush queued rows on shutdown."""
+    try:
+        LOG_Q.put(None, timeout=1)
+        _log_writer_thread.join(timeout=5)
+    except queue.Full:
+        pass
 
 def log_execution(username, language, code_hash, execution_time, success):
-    """Log code execution for monitoring and analytics."""
+    """Queue code execution for monitoring and analytics; never blocks the request."""
+    global _dropped_logs
     try:
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO execution_logs (username, language, code_hash, execution_time, success) VALUES (?, ?, ?, ?, ?)",
-            (username, language, code_hash, execution_time, success)
-        )
-        conn.commit()
-        conn.close()
-    except Exception as e:
-        logger.error(f"Failed to log execution: {e}")
+        LOG_Q.put_nowait((username, language, code_hash, execution_time, success))
+    except queue.Full:
+        # Logging must never break /execute; count what we had to drop
+        with _dropped_logs_lock:
+            _dropped_logs += 1
+        logger.warning("Execution log queue full, dropping entry")
 
 @app.route("/", methods=["GET"])
 def home():
@@ -84,8 +294,9 @@ def home():
         "message": "Agentic AI API is running!",
         "version": "2.0",
         "endpoints": [
-            "/register", "/login", "/execute", 
+            "/register", "/login", "/admin/users/batch", "/execute", 
             "/ai/explain", "/ai/analyze", "/ai/chat",
+            "/ai/analyze_batch", "/ai/batch/<batch_id>",
             "/stats", "/health"
         ]
     })
@@ -104,9 +315,8 @@ def health_check():
     
     # Check database
     try:
-        conn = sqlite3.connect("users.db")
-        conn.execute("SELECT 1")
-        conn.close()
+        with get_conn() as conn:
+            conn.execute("SELECT 1")
         health_status["services"]["database"] = "available"
     except Exception:
         health_status["services"]["database"] = "unavailable"
@@ -116,6 +326,93 @@ def health_check():
     
     return jsonify(health_status)
 
+# Argon2id for new and rehashed passwords. Accounts created before the switch
+# still hold bcrypt hashes; those are verified with bcrypt and upgraded to
+# Argon2id on the user's next successful login.
+# Cost parameters are tunable per deployment; aim for ~50 ms per hash on the
+# production hardware. Raising them upgrades existing hashes on next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 64 * 1024))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+
+# Each Argon2 hash allocates ARGON2_MEMORY_COST KiB, so cap how many run at once
+# per worker; peak hashing RAM is about workers x ARGON2_CONCURRENCY x memory cost
+ARGON2_CONCURRENCY = int(os.getenv("ARGON2_CONCURRENCY", os.cpu_count() or 4))
+_argon2_slots = threading.BoundedSemaphore(ARGON2_CONCURRENCY)
+
+password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM
+)
+
+# Verified in place of a real hash when the username doesn't exist, so unknown
+# and known usernames take the same time to reject
+DUMMY_HASH = password_hasher.hash(os.urandom(16).hex())
+
+# Legacy hashes rely on the Rust-backed bcrypt 4.x; 3.x is the slower cffi build
+if int(bcrypt.__version__.split(".")[0]) < 4:
+    logger.warning(f"bcrypt {bcrypt.__version__} is installed; upgrade to 4.x for faster legacy logins")
+
+# Worker processes for bulk password hashing, created on first use. Spawned
+# rather than forked because Gunicorn workers are multithreaded.
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def get_hash_pool():
+    """Return the process pool used to hash many passwords in parallel."""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_hash_pool.shutdown, cancel_futures=True)
+        return _hash_pool
+
+def validate_new_user(username, password, role):
+    """Return an error message for invalid registration fields, or None."""
+    if not isinstance(username, str) or not isinstance(password, str):
+        return "Username and password must be strings"
+    if len(username.strip()) < 3:
+        return "Username must be at least 3 characters"
+    if not password or len(password) < 6:
+        return "Password must be at least 6 characters"
+    if role not in ["user", "admin"]:
+        return "Invalid role"
+    return None
+
+def hash_password(password):
+    """Hash a password for storage in users.password."""
+    with _argon2_slots:
+        return password_hasher.hash(password)
+
+def verify_password(stored_hash, password):
+    """
+    Check a password against its stored hash.
+    
+    Returns (valid, new_hash); new_hash is set when the stored hash is bcrypt
+    or uses outdated Argon2 parameters and should be replaced.
+    """
+    if isinstance(stored_hash, bytes):
+        stored_hash = stored_hash.decode()
+    
+    if stored_hash.startswith("$2"):
+        if not bcrypt.checkpw(password.encode(), stored_hash.encode()):
+            return False, None
+        return True, hash_password(password)
+    
+    try:
+        with _argon2_slots:
+            password_hasher.verify(stored_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+    
+    if password_hasher.check_needs_rehash(stored_hash):
+        return True, hash_password(password)
+    return True, None
+
 @app.route("/register", methods=["POST"])
 def register():
     """Enhanced user registration with validation."""
@@ -124,36 +421,28 @@ def register():
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        username = data.get("username", "").strip()
+        username = data.get("username", "")
         password = data.get("password", "")
         role = data.get("role", "user")
         
         # Validation
-        if not username or len(username) < 3:
-            return jsonify({"error": "Username must be at least 3 characters"}), 400
-        
-        if not password or len(password) < 6:
-            return jsonify({"error": "Password must be at least 6 characters"}), 400
+        error = validate_new_user(username, password, role)
+        if error:
+            return jsonify({"error": error}), 400
+        username = username.strip()
         
-        if role not in ["user", "admin"]:
-            return jsonify({"error": "Invalid role"}), 400
+        hashed_password = hash_password(password)
         
-        hashed_password = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
-        
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                "INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
-                (username, hashed_password, role)
-            )
-            conn.commit()
-            logger.info(f"User {username} registered successfully")
-        except sqlite3.IntegrityError:
-            conn.close()
-            return jsonify({"error": "Username already exists"}), 409
-        finally:
-            conn.close()
+        with get_conn() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "INSERT INTO users (username, password, role) VALUES (?, ?, ?)", 
+                    (username, hashed_password, role)
+                )
+                logger.info(f"User {username} registered successfully")
+            except sqlite3.IntegrityError:
+                return jsonify({"error": "Username already exists"}), 409
         
         return jsonify({"message": "User registered successfully!", "username": username})
         
@@ -161,6 +450,72 @@ def register():
         logger.error(f"Registration error: {e}")
         return jsonify({"error": "Registration failed"}), 500
 
+@app.route("/admin/users/batch", methods=["POST"])
+@jwt_required()
+def register_batch():
+    """Create many users at once (admin only), hashing passwords across all cores."""
+    try:
+        if get_jwt()["role"] != "admin":
+            return jsonify({"error": "Admin access required"}), 403
+        
+        data = request.json
+        users = data.get("users") if data else None
+        if not isinstance(users, list) or not users:
+            return jsonify({"error": "No users provided"}), 400
+        
+        if len(users) > 100:
+            return jsonify({"error": "Too many users (max 100)"}), 400
+        
+        rows = []
+        for user in users:
+            if not isinstance(user, dict):
+                return jsonify({"error": "Each user must be an object"}), 400
+            username = user.get("username", "")
+            password = user.get("password", "")
+            role = user.get("role", "user")
+            
+            error = validate_new_user(username, password, role)
+            if error:
+                return jsonify({"error": f"{username or '<missing>'}: {error}"}), 400
+            rows.append((username.strip(), password, role))
+        
+        hashes = get_hash_pool().map(password_hasher.hash, [password for _, password, _ in rows])
+        
+        created, skipped = [], []
+        with get_conn() as conn:
+            conn.execute("BEGIN")
+            for (username, _, role), hashed_password in zip(rows, hashes):
+                try:
+                    conn.execute(
+                        "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                        (username, hashed_password, role)
+                    )
+                    created.append(username)
+                except sqlite3.IntegrityError:
+                    skipped.append(username)
+            conn.execute("COMMIT")
+        
+        logger.info(f"Batch registration: {len(created)} created, {len(skipped)} already existed")
+        
+        return jsonify({"created": created, "skipped": skipped})
+        
+    except Exception as e:
+        logger.error(f"Batch registration error: {e}")
+        return jsonify({"error": "Batch registration failed"}), 500
+
+# Recently verified logins. Keys are an HMAC of the credentials under a
+# per-process pepper, so the cache never holds plaintext passwords; only
+# successful password checks are cached.
+_login_cache = TTLCache(maxsize=10_000, ttl=60)
+_login_cache_lock = threading.Lock()
+_login_cache_pepper = os.urandom(32)
+
+def _login_cache_key(username, password):
+    password_digest = hashlib.sha256(password.encode()).hexdigest()
+    return hmac.new(
+        _login_cache_pepper, f"{username}:{password_digest}".encode(), hashlib.sha256
+    ).hexdigest()
+
 @app.route("/login", methods=["POST"])
 def login():
     """Enhanced login with better error handling."""
@@ -175,21 +530,38 @@ def login():
         if not username or not password:
             return jsonify({"error": "Username and password required"}), 400
         
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT password, role FROM users WHERE username=?", (username,))
-        user = cursor.fetchone()
-        conn.close()
+        # Skip the password KDF for credentials verified within the last minute
+        cache_key = _login_cache_key(username, password)
+        with _login_cache_lock:
+            role = _login_cache.get(cache_key)
+        
+        if role is None:
+            with get_conn() as conn:
+                user = conn.execute(
+                    "SELECT password, role FROM users WHERE username=?", (username,)
+                ).fetchone()
+            
+            valid, new_hash = verify_password(user[0] if user else DUMMY_HASH, password)
+            if valid and user is not None:
+                role = user[1]
+                with _login_cache_lock:
+                    _login_cache[cache_key] = role
+                
+                if new_hash is not None:
+                    with get_conn() as conn:
+                        conn.execute(
+                            "UPDATE users SET password=? WHERE username=?", (new_hash, username)
+                        )
         
-        if user and bcrypt.checkpw(password.encode(), user[0]):
+        if role is not None:
             access_token = create_access_token(
-                identity={"username": username, "role": user[1]}
+                identity=username, additional_claims={"role": role}
             )
             logger.info(f"User {username} logged in successfully")
             return jsonify({
                 "access_token": access_token,
                 "username": username,
-                "role": user[1],
+                "role": role,
                 "message": "Login successful"
             })
         else:
@@ -200,128 +572,543 @@ def login():
         logger.error(f"Login error: {e}")
         return jsonify({"error": "Login failed"}), 500
 
-def execute_code_in_docker(code, language, timeout=15):
+# Language configurations
+LANGUAGE_CONFIGS = {
+    "python": {
+        "filename": "code.py",
+        "docker_image": "python:3.9-slim",
+        "run_command": ["python", "/app/code.py"]
+    },
+    "cpp": {
+        "filename": "code.cpp",
+        "docker_image": "gcc:latest",
+        "run_command": ["bash", "-c", "cd /app && g++ -o code.out code.cpp && ./code.out"]
+    },
+    "java": {
+        "filename": "Main.java",
+        "docker_image": "openjdk:11-jdk-slim",
+        "run_command": ["bash", "-c", "cd /app && javac Main.java && java Main"]
+    },
+    "javascript": {
+        "filename": "code.js",
+        "docker_image": "node:16-slim",
+        "run_command": ["node", "/app/code.js"]
+    },
+    "go": {
+        "filename": "main.go",
+        "docker_image": "golang:1.19-alpine",
+        "run_command": ["go", "run", "/app/main.go"]
+    }
+}
+
+# Docker security settings shared by one-off and pooled sandboxes
+DOCKER_SECURITY_OPTS = (
+    "--memory=128m",           # Limit memory
+    "--memory-swap=128m",      # Disable swap
+    "--cpus=0.5",             # Limit CPU
+    "--network=none",         # No network access
+    "--cap-drop=ALL",         # Drop all capabilities
+    "--security-opt", "no-new-privileges",  # Security
+    "--pids-limit=128",       # No fork bombs
+    "--read-only",            # No writable layer; scratch space is tmpfs only
+)
+
+# Per-language (filename, image, run command), resolved once at import so
+# /execute only splats prebuilt tuples
+_LANG_CFG = MappingProxyType({
+    language: (config["filename"], config["docker_image"], tuple(config["run_command"]))
+    for language, config in LANGUAGE_CONFIGS.items()
+})
+
+# Source code is piped in over stdin and written to this scratch tmpfs, so
+# no host files or bind mounts are involved. /tmp takes compiler temporaries
+# and the Go build cache, since the root filesystem is read-only.
+_SANDBOX_TMPFS = (
+    "--tmpfs", "/app:rw,exec,size=16m",
+    "--tmpfs", "/tmp:rw,exec,size=64m",
+    "-e", "HOME=/tmp",
+    "-e", "GOCACHE=/tmp/go-build",
+)
+
+_DOCKER_RUN_BASE = ("docker", "run", "--rm", "-i", *DOCKER_SECURITY_OPTS, *_SANDBOX_TMPFS)
+
+# Deployments sharing a Docker host must use distinct values; defaults to the
+# bind address, matching gunicorn.conf.py
+SANDBOX_INSTANCE = os.getenv(
+    "SANDBOX_INSTANCE", f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+)
+
+_POOL_RUN_BASE = (
+    "docker", "run", "-d", "--init",
+    "--label", "agentic-ai-sandbox",
+    "--label", f"agentic-ai-sandbox.instance={SANDBOX_INSTANCE}",
+    *DOCKER_SECURITY_OPTS,
+    *_SANDBOX_TMPFS,
+)
+
+# Writes stdin to the source file and runs the command under an in-container
+# timeout (passed as $1) so runaway code can't outlive the request.
+_STDIN_RUN_SCRIPT = MappingProxyType({
+    language: (
+        "sh", "-c",
+        f'cat > /app/{filename} && t=$1 && shift && exec timeout -s KILL "$t" "$@"',
+        "sh"
+    )
+    for language, (filename, _, _) in _LANG_CFG.items()
+})
+
+# Prints the PIDs of every process in a pooled container except docker-init
+# (PID 1) and the shell running this script
+_SANDBOX_PS_SCRIPT = 'for p in /proc/[0-9]*; do p=${p#/proc/}; [ "$p" = 1 ] || [ "$p" = $$ ] || echo "$p"; done'
+
+# Puts a used pooled container back in its just-started state: SIGKILLs every
+# process except docker-init, the idle process (PID passed as $1) and itself,
+# wipes all writable scratch space, then prints whatever is still running.
+# `timeout` only signals its direct child, so anything the user's code forked
+# off and detached would otherwise survive into the next run.
+_SANDBOX_RESET_SCRIPT = """
+idle=$1
+others() {
+    found=
+    for p in /proc/[0-9]*; do
+        p=${p#/proc/}
+        case $p in 1|$$|$idle) ;; *) found="$found $p" ;; esac
+    done
+}
+for _ in 1 2 3; do
+    others
+    [ -z "$found" ] && break
+    kill -9 $found 2>/dev/null
+    sleep 0.1
+done
+rm -rf /app/* /app/.[!.]* /tmp/* /tmp/.[!.]* /dev/shm/* /dev/shm/.[!.]*
+others
+echo $found
+"""
+
+class ContainerPool:
+    """
+    Warm, locked-down sandbox containers per language, reused via `docker exec`
+    so executions skip container create/start/teardown.
+    
+    A container only ever runs code for the user it was first handed to. After
+    each run it is reset in the background (leftover processes killed, scratch
+    space wiped) and discarded if anything survives the reset, if it has served
+    max_uses runs, or if its owner leaves it idle for idle_ttl seconds.
+    """
+    
+    def __init__(self, pool_size=2, max_uses=50, max_owned=4, idle_ttl=300):
+        self.pool_size = pool_size
+        self.max_uses = max_uses
+        self.max_owned = max_owned
+        self.idle_ttl = idle_ttl
+        # Containers nobody has run code in yet
+        self._fresh = {language: queue.Queue() for language in LANGUAGE_CONFIGS}
+        # Reset containers waiting for their owner: (language, owner) -> [(container_id, idle_since)]
+        self._owned = {}
+        # container_id -> {"idle_pid", "owner", "uses"}
+        self._containers = {}
+        self._lock = threading.Lock()
+        self._resetter = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sandbox-reset")
+    
+    def start(self):
+        """Start the containers in the background so image pulls don't block startup."""
+        threading.Thread(target=self._fill, name="container-pool", daemon=True).start()
+        atexit.register(self.shutdown)
+    
+    def _fill(self):
+        for language in LANGUAGE_CONFIGS:
+            for _ in range(self.pool_size):
+                self._spawn(language)
+    
+    def _spawn(self, language):
+        _, image, _ = _LANG_CFG[language]
+        # The PID label lets the Gunicorn master remove this worker's containers
+        # even if the worker is killed before its atexit hook runs
+        docker_command = (
+            *_POOL_RUN_BASE,
+            "--label", f"agentic-ai-sandbox.pid={os.getpid()}",
+            image, "tail", "-f", "/dev/null"
+        )
+        
+        try:
+            result = subprocess.run(docker_command, capture_output=True, text=True, timeout=300)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning(f"Failed to start {language} sandbox: {e}")
+            return
+        
+        if result.returncode != 0:
+            logger.warning(f"Failed to start {language} sandbox: {result.stderr.strip()}")
+            return
+        
+        container_id = result.stdout.strip()
+        idle_pid = self._find_idle_pid(container_id)
+        if idle_pid is None:
+            logger.warning(f"Failed to start {language} sandbox: idle process not found")
+            self._remove(container_id)
+            return
+        
+        with self._lock:
+            self._containers[container_id] = {"idle_pid": idle_pid, "owner": None, "uses": 0}
+        self._fresh[language].put(container_id)
+    
+    @staticmethod
+    def _find_idle_pid(container_id):
+        """PID of the idle `tail` process, the only one besides docker-init at start-up."""
+        for _ in range(20):
+            try:
+                result = subprocess.run(
+                    ("docker", "exec", container_id, "sh", "-c", _SANDBOX_PS_SCRIPT),
+                    capture_output=True, text=True, timeout=10
+                )
+            except (OSError, subprocess.TimeoutExpired):
+                return None
+            
+            pids = result.stdout.split()
+            if result.returncode != 0 or len(pids) > 1:
+                return None
+            if pids:
+                return pids[0]
+            
+            # docker-init hasn't started its child yet
+            time.sleep(0.05)
+        return None
+    
+    def acquire(self, language, owner):
+        """Take an idle container for exclusive use by owner, or None if none is ready."""
+        self._prune()
+        
+        with self._lock:
+            owned = self._owned.get((language, owner))
+            if owned:
+                container_id, _ = owned.pop()
+                return container_id
+        
+        try:
+            container_id = self._fresh[language].get_nowait()
+        except queue.Empty:
+            return None
+        
+        with self._lock:
+            self._containers[container_id]["owner"] = owner
+        
+        # Keep the supply of fresh containers topped up
+        threading.Thread(target=self._spawn, args=(language,), daemon=True).start()
+        return container_id
+    
+    def release(self, language, container_id):
+        """Hand a container back after a run; it is reset before its owner can reuse it."""
+        with self._lock:
+            state = self._containers.get(container_id)
+            if state is None:
+                return
+            state["uses"] += 1
+            exhausted = state["uses"] >= self.max_uses
+        
+        if exhausted:
+            self.discard(container_id)
+        else:
+            self._resetter.submit(self._reset, language, container_id)
+    
+    def _reset(self, language, container_id):
+        with self._lock:
+            state = self._containers.get(container_id)
+        if state is None:
+            return
+        
+        try:
+            result = subprocess.run(
+                ("docker", "exec", container_id, "sh", "-c", _SANDBOX_RESET_SCRIPT, "sh", state["idle_pid"]),
+                capture_output=True, text=True, timeout=10
+            )
+            clean = result.returncode == 0 and not result.stdout.strip()
+        except (OSError, subprocess.TimeoutExpired):
+            clean = False
+        
+        if not clean:
+            logger.warning(f"Discarding {language} sandbox {container_id[:12]}: reset failed")
+            self.discard(container_id)
+            return
+        
+        with self._lock:
+            if container_id not in self._containers:
+                return
+            self._owned.setdefault((language, state["owner"]), []).append(
+                (container_id, time.monotonic())
+            )
+        self._prune()
+    
+    def _prune(self):
+        """Discard owned containers idle past idle_ttl, and the oldest beyond max_owned per language."""
+        now = time.monotonic()
+        expired = []
+        
+        with self._lock:
+            idle_by_language = {}
+            for (language, owner), owned in self._owned.items():
+                for container_id, idle_since in owned:
+                    idle_by_language.setdefault(language, []).append((idle_since, container_id, owner))
+            
+            for language, idle in idle_by_language.items():
+                idle.sort()
+                excess = len(idle) - self.max_owned
+                for index, (idle_since, container_id, owner) in enumerate(idle):
+                    if index < excess or now - idle_since > self.idle_ttl:
+                        self._owned[(language, owner)].remove((container_id, idle_since))
+                        expired.append(container_id)
+            
+            self._owned = {key: owned for key, owned in self._owned.items() if owned}
+        
+        for container_id in expired:
+            self.discard(container_id)
+    
+    def discard(self, container_id):
+        """Remove a container whose state can't be trusted or that is no longer needed."""
+        with self._lock:
+            self._containers.pop(container_id, None)
+        self._remove(container_id)
+    
+    @staticmethod
+    def _remove(container_id):
+        subprocess.Popen(
+            ["docker", "rm", "-f", container_id],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    
+    def shutdown(self):
+        self._resetter.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            container_ids = list(self._containers)
+            self._containers.clear()
+            self._owned.clear()
+        if container_ids:
+            subprocess.run(["docker", "rm", "-f", *container_ids], capture_output=True)
+
+# Every Gunicorn worker runs its own pool, so host-wide this is up to
+# workers x languages x (CONTAINER_POOL_SIZE + CONTAINER_POOL_MAX_OWNED) containers
+container_pool = ContainerPool(
+    pool_size=int(os.getenv("CONTAINER_POOL_SIZE", 2)),
+    max_owned=int(os.getenv("CONTAINER_POOL_MAX_OWNED", 4))
+)
+
+# Caps sandboxes running at once in this worker so a burst of /execute calls
+# can't oversubscribe the host's CPUs
+SANDBOX_CONCURRENCY = int(os.getenv("SANDBOX_CONCURRENCY", os.cpu_count() or 4))
+_sandbox_slots = threading.BoundedSemaphore(SANDBOX_CONCURRENCY)
+
+def _format_execution_result(result, start_time, code_hash):
+    """Build the /execute response payload from a completed docker process."""
+    execution_time = time.time() - start_time
+    success = result.returncode == 0
+    
+    output = result.stdout if success else f"Error (Code {result.returncode}):\n{result.stderr}"
+    
+    return {
+        "output": output.strip() if output.strip() else "Execution completed (no output)",
+        "success": success,
+        "execution_time": round(execution_time, 3),
+        "code_hash": code_hash
+    }
+
+def _code_hash(code):
+    """Short, stable identifier for a snippet in logs and responses."""
+    return xxhash.xxh3_64_hexdigest(code.encode())[:8]
+
+def _claim_sandbox(language, timeout):
+    """
+    Resolve the language config and take a sandbox slot.
+    
+    Returns (config, None) with the slot held, or (None, error message).
+    """
+    config = _LANG_CFG.get(language)
+    if config is None:
+        return None, f"Unsupported language: {language}"
+    if not _sandbox_slots.acquire(timeout=timeout):
+        return None, "All sandboxes are busy, please try again shortly"
+    return config, None
+
+def _sandbox_command(language, config, timeout, owner):
+    """
+    Build the docker argv for one run: `docker exec` into a warm container
+    reserved for owner when one is idle, otherwise a one-off `docker run`.
+    
+    Returns (container_id, argv); container_id is None for one-off runs.
+    """
+    _, image, run_command = config
+    run_script = (*_STDIN_RUN_SCRIPT[language], str(timeout), *run_command)
+    
+    container_id = container_pool.acquire(language, owner)
+    if container_id is not None:
+        return container_id, ("docker", "exec", "-i", container_id, *run_script)
+    return None, (*_DOCKER_RUN_BASE, image, *run_script)
+
+def _killed(returncode):
+    """137 = SIGKILL inside the container (in-container timeout or OOM); -9 = docker client killed."""
+    return returncode in (137, -9)
+
+def _dispose_container(language, container_id, reusable):
+    """Hand a pooled container back after a run, or discard it if its state can't be trusted."""
+    if container_id is None:
+        return
+    if reusable:
+        container_pool.release(language, container_id)
+    else:
+        container_pool.discard(container_id)
+
+def execute_code_in_docker(code, language, timeout=15, owner=None):
     """
     Enhanced Docker-based code execution with better security and error handling.
+    Uses a warm pooled container reserved for owner when one is idle, otherwise
+    a one-off `docker run`.
     """
-    import hashlib
+    code_hash = _code_hash(code)
     
-    start_time = time.time()
-    code_hash = hashlib.md5(code.encode()).hexdigest()[:8]
-    
-    # Language configurations
-    language_configs = {
-        "python": {
-            "filename": "code.py",
-            "docker_image": "python:3.9-slim",
-            "run_command": ["python", "/app/code.py"]
-        },
-        "cpp": {
-            "filename": "code.cpp",
-            "docker_image": "gcc:latest",
-            "run_command": ["bash", "-c", "cd /app && g++ -o code.out code.cpp && ./code.out"]
-        },
-        "java": {
-            "filename": "Main.java",
-            "docker_image": "openjdk:11-jdk-slim",
-            "run_command": ["bash", "-c", "cd /app && javac Main.java && java Main"]
-        },
-        "javascript": {
-            "filename": "code.js",
-            "docker_image": "node:16-slim",
-            "run_command": ["node", "/app/code.js"]
-        },
-        "go": {
-            "filename": "main.go",
-            "docker_image": "golang:1.19-alpine",
-            "run_command": ["go", "run", "/app/main.go"]
+    config, error = _claim_sandbox(language, timeout)
+    if error:
+        return {
+            "output": error,
+            "success": False,
+            "execution_time": 0
         }
-    }
     
-    if language not in language_configs:
+    # Timed from here so waiting for a slot doesn't count as run time
+    start_time = time.time()
+    try:
+        return _run_in_sandbox(code, language, config, timeout, start_time, code_hash, owner)
+    finally:
+        _sandbox_slots.release()
+
+def _run_in_sandbox(code, language, config, timeout, start_time, code_hash, owner):
+    """
+    Run code in a pooled or one-off container; the caller holds a sandbox slot
+    and start_time marks when it was acquired.
+    """
+    container_id, docker_command = _sandbox_command(language, config, timeout, owner)
+    
+    try:
+        result = subprocess.run(
+            docker_command,
+            input=code,
+            capture_output=True,
+            text=True,
+            timeout=timeout + 5
+        )
+    except subprocess.TimeoutExpired:
+        _dispose_container(language, container_id, reusable=False)
         return {
-            "output": f"Unsupported language: {language}",
+            "output": f"Execution timed out after {timeout} seconds",
+            "success": False,
+            "execution_time": timeout
+        }
+    except FileNotFoundError:
+        return {
+            "output": "Docker not found. Please install Docker to execute code.",
             "success": False,
             "execution_time": 0
         }
+    except Exception as e:
+        _dispose_container(language, container_id, reusable=False)
+        return {
+            "output": f"Execution error: {str(e)}",
+            "success": False,
+            "execution_time": time.time() - start_time
+        }
     
-    config = language_configs[language]
+    _dispose_container(language, container_id, reusable=not _killed(result.returncode))
     
-    # Create temporary directory for better isolation
-    with tempfile.TemporaryDirectory() as temp_dir:
-        file_path = os.path.join(temp_dir, config["filename"])
-        
-        # Write code to temporary file
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(code)
-        except Exception as e:
-            return {
-                "output": f"Failed to write code file: {str(e)}",
-                "success": False,
-                "execution_time": 0
-            }
-        
-        # Docker security settings
-        docker_command = [
-            "docker", "run", "--rm",
-            "--memory=128m",           # Limit memory
-            "--memory-swap=128m",      # Disable swap
-            "--cpus=0.5",             # Limit CPU
-            "--network=none",         # No network access
-            "--cap-drop=ALL",         # Drop all capabilities
-            "--security-opt", "no-new-privileges",  # Security
-            "-v", f"{temp_dir}:/app:ro",  # Read-only mount
-            config["docker_image"]
-        ] + config["run_command"]
-        
+    if _killed(result.returncode) and time.time() - start_time >= timeout:
+        return {
+            "output": f"Execution timed out after {timeout} seconds",
+            "success": False,
+            "execution_time": timeout
+        }
+    
+    return _format_execution_result(result, start_time, code_hash)
+
+def stream_code_in_docker(code, language, timeout=15, owner=None):
+    """
+    Run code like execute_code_in_docker, yielding {"output": line} events as
+    the program prints (stdout and stderr interleaved) and a final summary
+    event with success, execution_time, exit_code and code_hash.
+    """
+    code_hash = _code_hash(code)
+    
+    config, error = _claim_sandbox(language, timeout)
+    if error:
+        yield {"error": error}
+        return
+    
+    # Timed from here so waiting for a slot doesn't count as run time
+    start_time = time.time()
+    container_id = None
+    proc = None
+    watchdog = None
+    try:
+        container_id, docker_command = _sandbox_command(language, config, timeout, owner)
         try:
-            result = subprocess.run(
+            proc = subprocess.Popen(
                 docker_command,
-                capture_output=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 text=True,
-                timeout=timeout,
-                cwd=temp_dir
+                bufsize=1
             )
-            
-            execution_time = time.time() - start_time
-            success = result.returncode == 0
-            
-            output = result.stdout if success else f"Error (Code {result.returncode}):\n{result.stderr}"
-            
-            return {
-                "output": output.strip() if output.strip() else "Execution completed (no output)",
-                "success": success,
-                "execution_time": round(execution_time, 3),
-                "code_hash": code_hash
-            }
-            
-        except subprocess.TimeoutExpired:
-            return {
-                "output": f"Execution timed out after {timeout} seconds",
-                "success": False,
-                "execution_time": timeout
-            }
         except FileNotFoundError:
-            return {
-                "output": "Docker not found. Please install Docker to execute code.",
-                "success": False,
-                "execution_time": 0
-            }
-        except Exception as e:
-            return {
-                "output": f"Execution error: {str(e)}",
-                "success": False,
-                "execution_time": time.time() - start_time
-            }
+            yield {"error": "Docker not found. Please install Docker to execute code."}
+            return
+        
+        watchdog = threading.Timer(timeout + 5, proc.kill)
+        watchdog.start()
+        
+        # Code is capped at 10KB, well within the pipe buffer
+        try:
+            proc.stdin.write(code)
+            proc.stdin.close()
+        except BrokenPipeError:
+            # Docker exited before reading the code; its error is on stdout
+            pass
+        
+        # Bounded reads so a program that never prints a newline can't grow the buffer
+        for line in iter(lambda: proc.stdout.readline(4096), ""):
+            yield {"output": line}
+        
+        returncode = proc.wait()
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+        
+        # Client went away mid-stream: the in-container process may still be
+        # running, so the container can't be reused
+        aborted = proc is not None and proc.poll() is None
+        if aborted:
+            proc.kill()
+            proc.wait()
+        
+        _dispose_container(
+            language, container_id,
+            reusable=proc is None or not (aborted or _killed(proc.returncode))
+        )
+        _sandbox_slots.release()
+    
+    execution_time = time.time() - start_time
+    if _killed(returncode) and execution_time >= timeout:
+        yield {"error": f"Execution timed out after {timeout} seconds"}
+        execution_time = timeout
+    
+    yield {
+        "success": returncode == 0,
+        "exit_code": returncode,
+        "execution_time": round(execution_time, 3),
+        "code_hash": code_hash
+    }
 
 @app.route("/execute", methods=["POST"])
 @jwt_required()
 def execute():
     """Enhanced code execution endpoint with logging and analysis."""
     try:
-        current_user = get_jwt_identity()
-        username = current_user["username"]
+        username = get_jwt_identity()
         
         data = request.json
         if not data:
@@ -337,10 +1124,18 @@ def execute():
         if len(code) > 10000:  # 10KB limit
             return jsonify({"error": "Code too large (max 10KB)"}), 400
         
-        # Execute code
-        result = execute_code_in_docker(code, language)
+        if data.get("stream", False):
+            return sse_events(_stream_execution(username, code, language, data.get("analyze", False)))
         
-        # Log execution
+        # Execute code and, if requested, run AI analysis alongside it
+        exec_future = executor.submit(execute_code_in_docker, code, language, owner=username)
+        analysis_future = None
+        if data.get("analyze", False):
+            analysis_future = executor.submit(ai_processor.analyze_code, code, language)
+        
+        result = exec_future.result()
+        
+        # Log execution without holding up the response
         log_execution(
             username, 
             language, 
@@ -350,10 +1145,9 @@ def execute():
         )
         
         # Add AI analysis if requested
-        if data.get("analyze", False):
+        if analysis_future is not None:
             try:
-                analysis = ai_processor.analyze_code(code, language)
-                result["analysis"] = analysis
+                result["analysis"] = analysis_future.result()
             except Exception as e:
                 result["analysis_error"] = str(e)
         
@@ -365,6 +1159,52 @@ def execute():
         logger.error(f"Execution endpoint error: {e}")
         return jsonify({"error": "Execution failed"}), 500
 
+def _stream_execution(username, code, language, analyze):
+    """Events for a streamed /execute: program output, the summary, then any analysis."""
+    analysis_future = None
+    if analyze:
+        analysis_future = executor.submit(ai_processor.analyze_code, code, language)
+    
+    logged = False
+    try:
+        for event in stream_code_in_docker(code, language, owner=username):
+            if "success" in event:
+                log_execution(
+                    username, language, event["code_hash"], event["execution_time"], event["success"]
+                )
+                logged = True
+                logger.info(f"Code execution by {username}: {language}, success: {event['success']}")
+            yield event
+    finally:
+        # Runs that end without a summary (unsupported language, no free sandbox,
+        # Docker missing, client gone) are logged as failures, as /execute does
+        if not logged:
+            log_execution(username, language, _code_hash(code), 0, False)
+            logger.info(f"Code execution by {username}: {language}, success: False")
+    
+    if analysis_future is not None:
+        try:
+            yield {"analysis": analysis_future.result()}
+        except Exception as e:
+            yield {"analysis_error": str(e)}
+
+def sse_events(events):
+    """Send JSON events to the client as server-sent events as they are produced."""
+    def generate():
+        for event in events:
+            yield f"data: {app.json.dumps(event)}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def sse_response(chunks):
+    """Relay text chunks to the client as server-sent events as they are produced."""
+    return sse_events({"token": chunk} for chunk in chunks)
+
 @app.route("/ai/explain", methods=["POST"])
 @jwt_required()
 def ai_explain():
@@ -376,6 +1216,9 @@ def ai_explain():
         if not topic:
             return jsonify({"error": "No topic provided"}), 400
         
+        if data.get("stream", False):
+            return sse_response(ai_processor.stream_explanation(topic))
+        
         explanation = ai_processor.explain_topic(topic)
         
         return jsonify({
@@ -412,6 +1255,78 @@ def ai_analyze():
         logger.error(f"AI analysis error: {e}")
         return jsonify({"error": "Failed to analyze code"}), 500
 
+@app.route("/ai/analyze_batch", methods=["POST"])
+@jwt_required()
+def ai_analyze_batch():
+    """Queue bulk code analysis on the OpenAI Batch API; poll /ai/batch/<id> for results."""
+    try:
+        username = get_jwt_identity()
+        
+        data = request.json
+        jobs = data.get("jobs", []) if data else []
+        
+        if not jobs or not isinstance(jobs, list):
+            return jsonify({"error": "No jobs provided"}), 400
+        
+        if len(jobs) > 100:
+            return jsonify({"error": "Too many jobs (max 100)"}), 400
+        
+        for job in jobs:
+            if not isinstance(job, dict) or not job.get("code", "").strip():
+                return jsonify({"error": "Each job requires code"}), 400
+            if len(job["code"]) > 10000:
+                return jsonify({"error": "Code too large (max 10KB)"}), 400
+        
+        batch = ai_processor.submit_batch(jobs)
+        if "error" in batch:
+            return jsonify(batch), 503
+        
+        with get_conn() as conn:
+            conn.execute(
+                "INSERT INTO batch_jobs (batch_id, username, job_count, status) VALUES (?, ?, ?, ?)",
+                (batch["batch_id"], username, len(jobs), batch["status"])
+            )
+        
+        logger.info(f"Batch {batch['batch_id']} submitted by {username}: {len(jobs)} jobs")
+        
+        return jsonify({
+            "batch_id": batch["batch_id"],
+            "status": batch["status"],
+            "job_count": len(jobs)
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"AI batch submission error: {e}")
+        return jsonify({"error": "Failed to submit batch"}), 500
+
+@app.route("/ai/batch/<batch_id>", methods=["GET"])
+@jwt_required()
+def ai_batch_status(batch_id):
+    """Status and results of a batch submitted by the current user."""
+    try:
+        username = get_jwt_identity()
+        
+        with get_conn() as conn:
+            job = conn.execute(
+                "SELECT username FROM batch_jobs WHERE batch_id=?", (batch_id,)
+            ).fetchone()
+        
+        if not job or (job[0] != username and get_jwt()["role"] != "admin"):
+            return jsonify({"error": "Batch not found"}), 404
+        
+        result = ai_processor.get_batch(batch_id)
+        if "error" in result:
+            return jsonify(result), 502
+        
+        with get_conn() as conn:
+            conn.execute("UPDATE batch_jobs SET status=? WHERE batch_id=?", (result["status"], batch_id))
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"AI batch status error: {e}")
+        return jsonify({"error": "Failed to get batch status"}), 500
+
 @app.route("/ai/chat", methods=["POST"])
 @jwt_required()
 def ai_chat():
@@ -424,6 +1339,9 @@ def ai_chat():
         if not message:
             return jsonify({"error": "No message provided"}), 400
         
+        if data.get("stream", False):
+            return sse_response(ai_processor.stream_chat_response(message, context))
+        
         # Simple chat responses (extend with your preferred LLM)
         response = ai_processor.chat_response(message, context)
         
@@ -442,39 +1360,31 @@ def ai_chat():
 def get_stats():
     """Get execution statistics (admin only)."""
     try:
-        current_user = get_jwt_identity()
-        if current_user["role"] != "admin":
+        if get_jwt()["role"] != "admin":
             return jsonify({"error": "Admin access required"}), 403
         
-        conn = sqlite3.connect("users.db")
-        cursor = conn.cursor()
-        
-        # Get basic stats
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM execution_logs")
-        total_executions = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM execution_logs WHERE success = 1")
-        successful_executions = cursor.fetchone()[0]
-        
-        cursor.execute("""
-            SELECT language, COUNT(*) as count 
-            FROM execution_logs 
-            GROUP BY language 
-            ORDER BY count DESC
-        """)
-        language_stats = cursor.fetchall()
+        with get_conn() as conn:
+            # Get basic stats
+            total_users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            
+            # One pass over the covering index; totals are summed from the per-language rows
+            language_stats = conn.execute("""
+                SELECT language, COUNT(*) as count, SUM(success) as successes
+                FROM execution_logs 
+                GROUP BY language 
+                ORDER BY count DESC
+            """).fetchall()
         
-        conn.close()
+        total_executions = sum(row[1] for row in language_stats)
+        successful_executions = sum(row[2] or 0 for row in language_stats)
         
         return jsonify({
             "total_users": total_users,
             "total_executions": total_executions,
             "successful_executions": successful_executions,
             "success_rate": round((successful_executions / total_executions * 100), 2) if total_executions > 0 else 0,
-            "language_usage": dict(language_stats)
+            "language_usage": {language: count for language, count, _ in language_stats},
+            "dropped_log_entries": _dropped_logs
         })
         
     except Exception as e:
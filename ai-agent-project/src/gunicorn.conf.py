@@ -0,0 +1,51 @@
+# =============================================================================
+# GUNICORN.CONF.PY - Production Server Configuration
+# =============================================================================
+
+import multiprocessing
+import os
+import subprocess
+import threading
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+
+# Scopes sandbox cleanup to this deployment; workers inherit it from the master
+SANDBOX_INSTANCE = os.environ.setdefault("SANDBOX_INSTANCE", bind)
+
+# Threaded workers: /execute and /ai/* mostly wait on Docker and OpenAI, which
+# release the GIL, so each worker overlaps many in-flight requests
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 32))
+timeout = 120
+
+def post_worker_init(worker):
+    """Create tables and start the worker's sandbox pool before serving requests."""
+    from app import init_db
+    init_db()
+
+def on_starting(server):
+    """Remove sandbox containers left behind by a server that didn't shut down cleanly."""
+    _remove_sandboxes(f"agentic-ai-sandbox.instance={SANDBOX_INSTANCE}")
+
+def child_exit(server, worker):
+    """Remove an exited worker's sandboxes, including workers Gunicorn had to SIGKILL."""
+    threading.Thread(
+        target=_remove_sandboxes,
+        args=(f"agentic-ai-sandbox.instance={SANDBOX_INSTANCE}", f"agentic-ai-sandbox.pid={worker.pid}"),
+        daemon=True
+    ).start()
+
+def _remove_sandboxes(*labels):
+    """Force-remove sandbox containers carrying all of the given labels."""
+    filters = [arg for label in labels for arg in ("--filter", f"label={label}")]
+    try:
+        result = subprocess.run(
+            ["docker", "ps", "-aq", *filters],
+            capture_output=True, text=True, timeout=30
+        )
+        container_ids = result.stdout.split()
+        if container_ids:
+            subprocess.run(["docker", "rm", "-f", *container_ids], capture_output=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired):
+        pass
@@ -0,0 +1,146 @@
+# =============================================================================
+# LLM_CACHE.PY - Response Cache for AI Processing
+# =============================================================================
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Protocol
+
+import numpy as np
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache for exact-match entries."""
+
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+
+class MemoryLRUBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+class RedisBackend:
+    """Redis-backed cache so entries are shared across server workers."""
+
+    def __init__(self, url: str, prefix: str = "llm-cache:"):
+        import redis
+
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._redis.get(self.prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self._redis.set(self.prefix + key, value, ex=ttl)
+
+
+class LLMCache:
+    """Two-tier LLM response cache: exact request match plus semantic lookup."""
+
+    def __init__(self, backend: Optional[CacheBackend] = None,
+                 similarity_threshold: float = 0.92, max_vectors: int = 4096):
+        self.backend = backend or MemoryLRUBackend()
+        self.similarity_threshold = similarity_threshold
+        self.max_vectors = max_vectors
+
+        # Semantic tier: ring buffer of unit-normalised embeddings, allocated on
+        # first insert once the dimension is known. Each row points at an
+        # exact-tier key, and a key keeps its row when it is re-added.
+        self._vectors = None
+        self._row_keys: List[Optional[str]] = [None] * max_vectors
+        self._key_rows: Dict[str, int] = {}
+        self._next_row = 0
+        self._rows_used = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """Build a stable key from the request parameters that shape the response."""
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: str, ttl: int = 3600) -> None:
+        self.backend.set(key, value, ttl)
+
+    def get_similar(self, embedding: List[float]) -> Optional[str]:
+        """Return the cached response whose embedding is closest, if similar enough."""
+        query = self._normalize(embedding)
+
+        with self._lock:
+            if self._rows_used == 0:
+                return None
+            scores = self._vectors[:self._rows_used] @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                return None
+            key = self._row_keys[best]
+
+        # Expired exact entries simply turn into misses
+        return self.backend.get(key)
+
+    def add_similar(self, embedding: List[float], key: str) -> None:
+        """Index an embedding so near-duplicate requests resolve to ``key``."""
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_vectors, vector.shape[0]), dtype=np.float32)
+
+            row = self._key_rows.get(key)
+            if row is None:
+                # Take the next slot, evicting the oldest entry once full
+                row = self._next_row
+                self._next_row = (row + 1) % self.max_vectors
+                self._rows_used = max(self._rows_used, row + 1)
+
+                evicted = self._row_keys[row]
+                if evicted is not None:
+                    del self._key_rows[evicted]
+                self._row_keys[row] = key
+                self._key_rows[key] = row
+
+            self._vectors[row] = vector
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
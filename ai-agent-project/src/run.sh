@@ -65,7 +65,7 @@ run_production() {
     echo -e "${YELLOW}Starting production server...${NC}"
     export FLASK_DEBUG=False
     export FLASK_ENV=production
-    gunicorn --bind 0.0.0.0:5000 --workers 4 --timeout 120 app:app
+    gunicorn -c gunicorn.conf.py app:app
 }
 
 run_docker() {
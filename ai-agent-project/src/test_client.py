@@ -5,14 +5,25 @@ Demonstrates API usage and functionality
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import base64
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 class AgenticAIClient:
     def __init__(self, base_url="http://localhost:5000"):
         self.base_url = base_url
         self.token = None
-        self.headers = {"Content-Type": "application/json"}
+        self.token_exp = 0
+        self._credentials = None
+        
+        # One keep-alive session so every call reuses the same connection
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json"})
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
     def register(self, username, password, role="user"):
         """Register a new user"""
@@ -22,7 +33,7 @@ class AgenticAIClient:
             "password": password,
             "role": role
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
         return response.json(), response.status_code
     
     def login(self, username, password):
@@ -32,18 +43,35 @@ class AgenticAIClient:
             "username": username,
             "password": password
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
         result = response.json()
         
         if response.status_code == 200:
             self.token = result.get("access_token")
-            self.headers["Authorization"] = f"Bearer {self.token}"
+            self.token_exp = self._token_expiry(self.token)
+            self._credentials = (username, password)
+            self.session.headers["Authorization"] = f"Bearer {self.token}"
         
         return result, response.status_code
     
+    @staticmethod
+    def _token_expiry(token):
+        """Read the exp claim from a JWT without verifying it (the server does that)"""
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get("exp", 0)
+    
+    def _authenticated(self):
+        """Ensure a usable token, logging in again shortly before it expires"""
+        if not self.token:
+            return False
+        if self._credentials and time.time() > self.token_exp - 30:
+            self.login(*self._credentials)
+        return time.time() < self.token_exp
+    
     def execute_code(self, code, language="python", analyze=False):
         """Execute code with optional AI analysis"""
-        if not self.token:
+        if not self._authenticated():
             return {"error": "Not authenticated"}, 401
         
         url = f"{self.base_url}/execute"
@@ -52,22 +80,22 @@ class AgenticAIClient:
             "language": language,
             "analyze": analyze
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
         return response.json(), response.status_code
     
     def ai_explain(self, topic):
         """Get AI explanation of a topic"""
-        if not self.token:
+        if not self._authenticated():
             return {"error": "Not authenticated"}, 401
         
         url = f"{self.base_url}/ai/explain"
         data = {"topic": topic}
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
         return response.json(), response.status_code
     
     def ai_analyze(self, code, language="python"):
         """Get AI analysis of code"""
-        if not self.token:
+        if not self._authenticated():
             return {"error": "Not authenticated"}, 401
         
         url = f"{self.base_url}/ai/analyze"
@@ -75,12 +103,31 @@ class AgenticAIClient:
             "code": code,
             "language": language
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
+        return response.json(), response.status_code
+    
+    def ai_analyze_batch(self, jobs):
+        """Submit code analysis jobs to the batch queue"""
+        if not self._authenticated():
+            return {"error": "Not authenticated"}, 401
+        
+        url = f"{self.base_url}/ai/analyze_batch"
+        data = {"jobs": jobs}
+        response = self.session.post(url, json=data)
+        return response.json(), response.status_code
+    
+    def get_batch(self, batch_id):
+        """Get status and results of a batch analysis"""
+        if not self._authenticated():
+            return {"error": "Not authenticated"}, 401
+        
+        url = f"{self.base_url}/ai/batch/{batch_id}"
+        response = self.session.get(url)
         return response.json(), response.status_code
     
     def ai_chat(self, message, context=None):
         """Chat with AI assistant"""
-        if not self.token:
+        if not self._authenticated():
             return {"error": "Not authenticated"}, 401
         
         url = f"{self.base_url}/ai/chat"
@@ -88,22 +135,22 @@ class AgenticAIClient:
             "message": message,
             "context": context or []
         }
-        response = requests.post(url, json=data, headers=self.headers)
+        response = self.session.post(url, json=data)
         return response.json(), response.status_code
     
     def get_stats(self):
         """Get execution statistics (admin only)"""
-        if not self.token:
+        if not self._authenticated():
             return {"error": "Not authenticated"}, 401
         
         url = f"{self.base_url}/stats"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url)
         return response.json(), response.status_code
     
     def health_check(self):
         """Check server health"""
         url = f"{self.base_url}/health"
-        response = requests.get(url)
+        response = self.session.get(url)
         return response.json(), response.status_code
 
 def demo():
@@ -136,25 +183,17 @@ def demo():
         print("❌ Login failed, stopping demo")
         return
     
-    # Execute Python code
-    print("\n4. Code Execution - Python")
+    # Steps 4-8 don't depend on each other, so send them all at once
     python_code = """
 def fibonacci(n):
-    if n <= 1:
-        return n
-    return fibonacci(n-1) + fibonacci(n-2)
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
 
 for i in range(10):
     print(f"Fibonacci({i}) = {fibonacci(i)}")
 """
-    result, status = client.execute_code(python_code, "python", analyze=True)
-    print(f"Status: {status}")
-    print(f"Output: {result.get('output', 'No output')}")
-    print(f"Success: {result.get('success', False)}")
-    print(f"Execution Time: {result.get('execution_time', 0)}s")
-    
-    # Execute JavaScript code
-    print("\n5. Code Execution - JavaScript")
     js_code = """
 function isPrime(num) {
     if (num <= 1) return false;
@@ -178,34 +217,52 @@ while (count < 10) {
     num++;
 }
 """
-    result, status = client.execute_code(js_code, "javascript")
+    analysis_code = """
+def bubble_sort(arr):
+    n = len(arr)
+    for i in range(n):
+        for j in range(0, n-i-1):
+            if arr[j] > arr[j+1]:
+                arr[j], arr[j+1] = arr[j+1], arr[j]
+    return arr
+"""
+    
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        python_run = pool.submit(client.execute_code, python_code, "python", analyze=True)
+        js_run = pool.submit(client.execute_code, js_code, "javascript")
+        explanation = pool.submit(client.ai_explain, "binary search algorithm")
+        analysis = pool.submit(client.ai_analyze, analysis_code, "python")
+        chat = pool.submit(client.ai_chat, "What is the time complexity of quicksort?")
+    
+    # Execute Python code
+    print("\n4. Code Execution - Python")
+    result, status = python_run.result()
+    print(f"Status: {status}")
+    print(f"Output: {result.get('output', 'No output')}")
+    print(f"Success: {result.get('success', False)}")
+    print(f"Execution Time: {result.get('execution_time', 0)}s")
+    
+    # Execute JavaScript code
+    print("\n5. Code Execution - JavaScript")
+    result, status = js_run.result()
     print(f"Status: {status}")
     print(f"Output: {result.get('output', 'No output')}")
     
     # AI Explanation
     print("\n6. AI Topic Explanation")
-    result, status = client.ai_explain("binary search algorithm")
+    result, status = explanation.result()
     print(f"Status: {status}")
     print(f"Explanation: {result.get('explanation', 'No explanation')[:200]}...")
     
     # AI Code Analysis
     print("\n7. AI Code Analysis")
-    analysis_code = """
-def bubble_sort(arr):
-    n = len(arr)
-    for i in range(n):
-        for j in range(0, n-i-1):
-            if arr[j] > arr[j+1]:
-                arr[j], arr[j+1] = arr[j+1], arr[j]
-    return arr
-"""
-    result, status = client.ai_analyze(analysis_code, "python")
+    result, status = analysis.result()
     print(f"Status: {status}")
     print(f"Analysis: {json.dumps(result.get('analysis', {}), indent=2)}")
     
     # AI Chat
     print("\n8. AI Chat")
-    result, status = client.ai_chat("What is the time complexity of quicksort?")
+    result, status = chat.result()
     print(f"Status: {status}")
     print(f"Response: {result.get('response', 'No response')}")
     